@@ -1,38 +1,8 @@
 import streamlit as st
 import pandas as pd
 
-# 데이터 로딩 함수 (다른 페이지와 캐시 공유)
-@st.cache_data
-def load_data():
-    """
-    데이터를 불러오고 기본적인 전처리를 수행합니다.
-    """
-    dtype_spec = {'호선명': str, '지하철역': str}
-    try:
-        df = pd.read_csv('지하철데이터.csv', encoding='cp949', dtype=dtype_spec)
-    except UnicodeDecodeError:
-        df = pd.read_csv('지하철데이터.csv', encoding='utf-8-sig', dtype=dtype_spec)
-    except FileNotFoundError:
-        st.error("😥 '지하철데이터.csv' 파일을 찾을 수 없습니다. 프로젝트 루트 디렉토리에 파일을 업로드해주세요.")
-        return None
-    
-    df.dropna(subset=['호선명', '지하철역'], inplace=True)
-    df = df.iloc[:, :-1]
-    
-    col_names = ['사용월', '호선명', '역ID', '지하철역']
-    for i in range(4, len(df.columns), 2):
-        time_str = df.columns[i].split('~')[0][:2]
-        col_names.append(f'{time_str}_승차')
-        col_names.append(f'{time_str}_하차')
-    df.columns = col_names
-    
-    value_cols = [c for c in df.columns if '_승차' in c or '_하차' in c]
-    for col in value_cols:
-        if df[col].dtype == 'object':
-            df[col] = pd.to_numeric(df[col].str.replace(',', ''), errors='coerce').fillna(0).astype(int)
-        else:
-            df[col] = df[col].fillna(0).astype(int)
-    return df
+# 데이터 로딩 함수 (모든 페이지와 캐시 공유)
+from utils.data import load_data, load_station_hourly_agg, station_index
 
 # --- 메인 페이지 UI ---
 st.set_page_config(
@@ -96,12 +66,29 @@ st.markdown("---")
 st.header("💾 원본 데이터 확인 및 다운로드")
 df = load_data()
 if df is not None:
+    # 랜딩 페이지에서 파생 캐시도 미리 덥혀 두면(웜업),
+    # 분석 페이지로 처음 이동할 때 집계·정렬 비용 없이 캐시에서 바로 가져옵니다.
+    load_station_hourly_agg()
+    station_index()
+
     st.dataframe(df.head(10))
     
     # 다운로드를 위한 CSV 변환 함수
-    @st.cache_data
+    # load_data()는 항상 같은 캐시 객체를 돌려주므로, 값 전체를 해싱하는 대신
+    # 객체 id로 캐시 키를 만들어 버튼 렌더링마다 드는 해싱 비용을 없앱니다.
+    @st.cache_data(hash_funcs={pd.DataFrame: id})
     def convert_df_to_csv(df):
-        return df.to_csv(index=False).encode('utf-8-sig')
+        # pandas to_csv의 파이썬 행 포매팅 대신 pyarrow의 C++ CSV 작성기를 사용합니다.
+        try:
+            import io
+            import pyarrow as pa
+            from pyarrow import csv as pacsv
+        except ImportError:
+            return df.to_csv(index=False).encode('utf-8-sig')
+        buf = io.BytesIO()
+        buf.write(b'\xef\xbb\xbf')  # 엑셀 호환을 위한 UTF-8 BOM
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+        return buf.getvalue()
 
     csv_data = convert_df_to_csv(df)
     
@@ -3,66 +3,38 @@ import pandas as pd
 import plotly.express as px
 
 # 데이터 로딩 함수 (모든 페이지에서 캐시 공유)
-@st.cache_data
-def load_data():
-    dtype_spec = {'호선명': str, '지하철역': str}
-    try:
-        df = pd.read_csv('지하철데이터.csv', encoding='cp949', dtype=dtype_spec)
-    except UnicodeDecodeError:
-        df = pd.read_csv('지하철데이터.csv', encoding='utf-8-sig', dtype=dtype_spec)
-    except FileNotFoundError:
-        st.error("😥 '지하철데이터.csv' 파일을 찾을 수 없습니다. 프로젝트 루트 디렉토리에 파일을 업로드해주세요.")
-        return None
-    
-    df.dropna(subset=['호선명', '지하철역'], inplace=True)
-    df = df.iloc[:, :-1]
-    
-    col_names = ['사용월', '호선명', '역ID', '지하철역']
-    for i in range(4, len(df.columns), 2):
-        time_str = df.columns[i].split('~')[0][:2]
-        col_names.append(f'{time_str}_승차')
-        col_names.append(f'{time_str}_하차')
-    df.columns = col_names
-    
-    value_cols = [c for c in df.columns if '_승차' in c or '_하차' in c]
-    for col in value_cols:
-        if df[col].dtype == 'object':
-            df[col] = pd.to_numeric(df[col].str.replace(',', ''), errors='coerce').fillna(0).astype(int)
-        else:
-            df[col] = df[col].fillna(0).astype(int)
-            
-    id_vars = ['사용월', '호선명', '역ID', '지하철역']
-    df_long = df.melt(id_vars=id_vars, var_name='시간구분', value_name='인원수')
-    df_long['시간대'] = df_long['시간구분'].str.split('_').str[0]
-    df_long['구분'] = df_long['시간구분'].str.split('_').str[1]
-    df_long = df_long.drop(columns=['시간구분'])
-    return df_long
+from utils.data import load_data, top_n_by
 
-df_long = load_data()
+df = load_data()
 
 st.header("🚉 유동인구가 가장 많은 역은?")
 st.markdown("전체 또는 특정 호선에서 하루 동안 가장 많은 사람이 오고 간 역을 확인합니다.")
 
-if df_long is not None:
+if df is not None:
     top_n = st.slider("📈 TOP N 선택", 5, 50, 20)
     combine_stations = st.checkbox("🔁 동일 역명 데이터 합산", help="체크 시, 모든 호선의 데이터를 합산하여 역별 순위를 계산합니다.")
 
-    # 데이터 집계
+    # 데이터 집계: melt 없이 와이드 프레임의 행 합산 한 번이면
+    # 역별 총 유동인구가 나옵니다. 이후 groupby는 역 수(≤600) 규모입니다.
+    value_cols = [c for c in df.columns if '_승차' in c or '_하차' in c]
+    totals = df[['호선명', '지하철역']].copy()
+    totals['인원수'] = df[value_cols].to_numpy().sum(axis=1)
+
     if combine_stations:
         st.info("동일 역명 합산 모드에서는 전체 호선 기준으로 유동인구를 분석합니다.")
-        total_traffic = df_long.groupby('지하철역')['인원수'].sum().nlargest(top_n).reset_index()
-        total_traffic['역명(호선)'] = total_traffic['지하철역'] + " (통합)"
+        total_traffic = top_n_by(totals.groupby('지하철역', as_index=False, observed=True)['인원수'].sum(), '인원수', top_n)
+        total_traffic['역명(호선)'] = total_traffic['지하철역'].astype(str) + " (통합)"
     else:
-        line_list = ['전체'] + sorted(df_long['호선명'].unique())
+        line_list = ['전체'] + sorted(df['호선명'].unique())
         selected_line = st.selectbox('호선을 선택하세요.', line_list)
-        
+
         if selected_line == '전체':
-            df_filtered = df_long
+            df_filtered = totals
         else:
-            df_filtered = df_long[df_long['호선명'] == selected_line]
-        
-        total_traffic = df_filtered.groupby(['호선명', '지하철역'])['인원수'].sum().nlargest(top_n).reset_index()
-        total_traffic['역명(호선)'] = total_traffic['지하철역'] + "(" + total_traffic['호선명'] + ")"
+            df_filtered = totals[totals['호선명'] == selected_line]
+
+        total_traffic = top_n_by(df_filtered.groupby(['호선명', '지하철역'], as_index=False, observed=True)['인원수'].sum(), '인원수', top_n)
+        total_traffic['역명(호선)'] = total_traffic['지하철역'].astype(str) + "(" + total_traffic['호선명'].astype(str) + ")"
 
     # 1위 역 정보 추출 및 표시
     if not total_traffic.empty:
@@ -1,46 +1,11 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
-# 데이터 로딩 및 전처리 함수
-@st.cache_data
-def load_and_prep_data():
-    """
-    데이터를 로드하고 모든 전처리를 수행하여 분석에 바로 사용할 수 있는
-    깨끗한 '와이드' 포맷의 데이터프레임을 반환합니다.
-    """
-    dtype_spec = {'호선명': str, '지하철역': str}
-    try:
-        df = pd.read_csv('지하철데이터.csv', encoding='cp949', dtype=dtype_spec)
-    except UnicodeDecodeError:
-        df = pd.read_csv('지하철데이터.csv', encoding='utf-8-sig', dtype=dtype_spec)
-    except FileNotFoundError:
-        st.error("😥 '지하철데이터.csv' 파일을 찾을 수 없습니다. 프로젝트 루트 디렉토리에 파일을 업로드해주세요.")
-        return None
-    
-    df.dropna(subset=['호선명', '지하철역'], inplace=True)
-    df = df.iloc[:, :-1].copy() # 불필요한 마지막 열 제거 및 복사본 생성
-    
-    # 컬럼 이름 재정의
-    col_names = ['사용월', '호선명', '역ID', '지하철역']
-    for i in range(4, len(df.columns), 2):
-        time_str = df.columns[i].split('~')[0][:2]
-        col_names.append(f'{time_str}_승차')
-        col_names.append(f'{time_str}_하차')
-    df.columns = col_names
-    
-    # 인원수 데이터 숫자형으로 변환
-    value_cols = [c for c in df.columns if '_승차' in c or '_하차' in c]
-    for col in value_cols:
-        if df[col].dtype == 'object':
-            df[col] = pd.to_numeric(df[col].str.replace(',', ''), errors='coerce').fillna(0).astype(int)
-        else:
-            df[col] = df[col].fillna(0).astype(int)
-            
-    return df
+# 데이터 로딩 및 전처리 함수 (모든 페이지와 캐시 공유)
+from utils.data import load_data as load_and_prep_data
+from utils.data import station_index
 
 # 패턴 분석용 데이터 생성 함수
 @st.cache_data
@@ -56,19 +21,59 @@ def get_pattern_data(df_clean, combine_stations, analysis_type):
         value_cols = [c for c in df_clean.columns if '_승차' in c or '_하차' in c]
 
     if combine_stations:
-        df_wide = df_clean.groupby('지하철역')[value_cols].sum()
+        df_wide = df_clean.groupby('지하철역', observed=True)[value_cols].sum()
     else:
         df_wide = df_clean.set_index(['호선명', '지하철역'])[value_cols]
-    
-    df_wide.fillna(0, inplace=True)
-    
+
     # 정규화: 각 역의 총합으로 나눈 비율로 변경
-    row_sums = df_wide.sum(axis=1)
-    row_sums[row_sums == 0] = 1
-    df_normalized = df_wide.div(row_sums, axis=0)
-    
+    # pandas div 브로드캐스트 대신 float32 NumPy 단일 패스로 계산합니다.
+    # (float32는 이후 코사인 유사도 계산의 메모리 대역폭도 절반으로 줄입니다)
+    arr = df_wide.to_numpy(dtype=np.float32)
+    row_sums = arr.sum(axis=1, keepdims=True)
+    np.divide(arr, row_sums, out=arr, where=row_sums > 0)
+    df_normalized = pd.DataFrame(arr, index=df_wide.index, columns=df_wide.columns)
+
     return df_normalized
 
+# 단위 벡터 행렬 캐시: 위젯 조합이 같으면 역을 바꿔 선택해도 재정규화하지 않습니다.
+@st.cache_data(show_spinner=False)
+def get_unit_vectors(combine_stations, analysis_type):
+    """
+    (합산 여부, 분석 기준) 조합별로 패턴 행렬을 L2 단위 벡터로 정규화해 캐시합니다.
+    """
+    df_normalized = get_pattern_data(load_and_prep_data(), combine_stations, analysis_type)
+    X = df_normalized.to_numpy()
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+# 역 선택 위젯용 목록 캐시: 합산 여부별로 답이 고정이므로 리런마다 재정렬하지 않습니다.
+@st.cache_data(show_spinner=False)
+def get_station_list(combine_stations):
+    """
+    정렬된 역 목록과 {역: 위치} 딕셔너리를 반환합니다.
+    목록 자체는 모든 페이지가 공유하는 utils.data.station_index에서 가져옵니다.
+    """
+    names, line_pairs = station_index()
+    stations = names if combine_stations else line_pairs
+    return stations, {s: i for i, s in enumerate(stations)}
+
+# 선택한 역과 가장 유사한 상위 k개 역 계산 함수
+def topk_similar(df_normalized, station_key, combine_stations, analysis_type, k):
+    """
+    캐시된 단위 벡터 행렬과 선택한 역 한 행의 행렬·벡터 곱으로 유사도를 구한 뒤,
+    전체 O(N log N) 정렬 대신 np.argpartition으로 상위 k개만 골라
+    그 k개만 정렬합니다. (자기 자신은 제외)
+    """
+    X = get_unit_vectors(combine_stations, analysis_type)
+    query_idx = df_normalized.index.get_loc(station_key)
+    scores = X @ X[query_idx]
+    scores[query_idx] = -np.inf  # 자기 자신(유사도 1.0)은 순위에서 제외
+    k = min(k, len(scores) - 1)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    idx = idx[np.argsort(-scores[idx], kind='stable')]
+    return pd.DataFrame({'유사도': scores[idx]}, index=df_normalized.index[idx])
+
 # --- 앱 UI 부분 ---
 st.header("🤔 나와 비슷한 역은 어디?")
 st.markdown("선택한 역과 시간대별 승하차 패턴이 가장 유사한 역을 찾아 비교합니다.")
@@ -87,38 +92,28 @@ if df_clean is not None:
 
     top_n = st.slider("📊 비교할 유사역 개수 (TOP N)", 1, 10, 3, help="비교하고 싶은 상위 유사역의 개수를 선택하세요.")
 
-    df_pattern_normalized = get_pattern_data(df_clean.copy(), combine_stations, analysis_type)
+    # get_pattern_data는 입력을 수정하지 않으므로(그룹화·인덱스 설정 모두 비파괴 연산)
+    # 해시 전에 프레임 전체를 복사할 필요가 없습니다.
+    df_pattern_normalized = get_pattern_data(df_clean, combine_stations, analysis_type)
+
+    station_list, station_pos = get_station_list(combine_stations)
 
     if combine_stations:
-        station_list = sorted(df_pattern_normalized.index.to_list())
         selected_station_name = st.selectbox("기준이 될 역을 선택하세요.", station_list)
-        selected_station_pattern = df_pattern_normalized.loc[selected_station_name]
-        
-        similarity = cosine_similarity([selected_station_pattern], df_pattern_normalized)
-        sim_df = pd.DataFrame(similarity.T, index=df_pattern_normalized.index, columns=['유사도'])
-        sim_df = sim_df.drop(selected_station_name).sort_values(by='유사도', ascending=False)
-        top_n_similar = sim_df.head(top_n)
-        
+        top_n_similar = topk_similar(df_pattern_normalized, selected_station_name, combine_stations, analysis_type, top_n)
+
     else:
-        station_list = sorted(df_pattern_normalized.index.to_list(), key=lambda x: (x[1], x[0]))
-        
-        default_station = ('2호선', '강남')
-        default_index = 0
-        if default_station in station_list:
-            default_index = station_list.index(default_station)
-            
+        # 리스트 선형 탐색 대신 캐시된 위치 딕셔너리로 기본 선택 인덱스를 찾습니다.
+        default_index = station_pos.get(('2호선', '강남'), 0)
+
+
         selected_station_tuple = st.selectbox(
             "기준이 될 역을 선택하세요.",
             station_list,
             index=default_index,
             format_func=lambda x: f"{x[1]} ({x[0]})"
         )
-        selected_station_pattern = df_pattern_normalized.loc[selected_station_tuple]
-
-        similarity = cosine_similarity([selected_station_pattern], df_pattern_normalized)
-        sim_df = pd.DataFrame(similarity.T, index=df_pattern_normalized.index, columns=['유사도'])
-        sim_df = sim_df.drop(selected_station_tuple).sort_values(by='유사도', ascending=False)
-        top_n_similar = sim_df.head(top_n)
+        top_n_similar = topk_similar(df_pattern_normalized, selected_station_tuple, combine_stations, analysis_type, top_n)
 
     # --- 패턴 비교 그래프 (먼저 표시) ---
     st.subheader(f"📊 '{selected_station_name if combine_stations else selected_station_tuple[1]}' 패턴 비교 그래프")
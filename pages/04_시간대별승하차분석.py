@@ -2,56 +2,16 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
-# 데이터 로딩 및 전처리 함수
-@st.cache_data
-def load_and_prep_data():
-    """
-    데이터를 로드하고 모든 전처리를 수행하여 분석에 바로 사용할 수 있는
-    깨끗한 '와이드' 포맷의 데이터프레임을 반환합니다.
-    """
-    dtype_spec = {'호선명': str, '지하철역': str}
-    try:
-        df = pd.read_csv('지하철데이터.csv', encoding='cp949', dtype=dtype_spec)
-    except UnicodeDecodeError:
-        df = pd.read_csv('지하철데이터.csv', encoding='utf-8-sig', dtype=dtype_spec)
-    except FileNotFoundError:
-        st.error("😥 '지하철데이터.csv' 파일을 찾을 수 없습니다. 프로젝트 루트 디렉토리에 파일을 업로드해주세요.")
-        return None
-    
-    df.dropna(subset=['호선명', '지하철역'], inplace=True)
-    df = df.iloc[:, :-1].copy() # 불필요한 마지막 열 제거 및 복사본 생성
-    
-    # 컬럼 이름 재정의
-    col_names = ['사용월', '호선명', '역ID', '지하철역']
-    for i in range(4, len(df.columns), 2):
-        time_str = df.columns[i].split('~')[0][:2]
-        col_names.append(f'{time_str}_승차')
-        col_names.append(f'{time_str}_하차')
-    df.columns = col_names
-    
-    # 인원수 데이터 숫자형으로 변환
-    value_cols = [c for c in df.columns if '_승차' in c or '_하차' in c]
-    for col in value_cols:
-        if df[col].dtype == 'object':
-            df[col] = pd.to_numeric(df[col].str.replace(',', ''), errors='coerce').fillna(0).astype(int)
-        else:
-            df[col] = df[col].fillna(0).astype(int)
-            
-    # Long format으로 변환
-    id_vars = ['사용월', '호선명', '역ID', '지하철역']
-    df_long = df.melt(id_vars=id_vars, var_name='시간구분', value_name='인원수')
-    df_long['시간대'] = df_long['시간구분'].str.split('_').str[0]
-    df_long['구분'] = df_long['시간구분'].str.split('_').str[1]
-    df_long = df_long.drop(columns=['시간구분'])
-    return df_long
+# 데이터 로딩 및 전처리 함수 (모든 페이지와 캐시 공유)
+from utils.data import load_data, line_color_map, TIME_SLOT_DTYPE, DISPLAY_TIME_SLOTS
 
 # --- 앱 UI 부분 ---
 st.header("🏆 시간대별 1위 역 변천사")
 st.markdown("각 시간대별로 가장 많은 사람이 이용한 역은 어디일까요? 시간의 흐름에 따른 '챔피언'의 변화를 확인해보세요.")
 
-df_long = load_and_prep_data()
+df_wide = load_data()
 
-if df_long is not None:
+if df_wide is not None:
     combine_stations = st.checkbox("🔁 동일 역명 데이터 합산", help="체크 시, 환승역 데이터를 합산하여 분석합니다.")
     
     show_line_contribution = False
@@ -60,23 +20,47 @@ if df_long is not None:
 
     st.markdown("---")
 
-    # 데이터 준비
+    # 데이터 준비 — melt된 long 프레임(와이드의 수십 배) 대신 와이드 프레임에서 바로 집계합니다.
+    value_cols = [c for c in df_wide.columns if '_승차' in c or '_하차' in c]
+
     if combine_stations:
-        grouped_by_name = df_long.groupby(['시간대', '구분', '지하철역'])['인원수'].sum().reset_index()
-        top_station_info = grouped_by_name.loc[grouped_by_name.groupby(['시간대', '구분'])['인원수'].idxmax()]
-        
+        # 역별 합산 후 컬럼별 idxmax만 하면 (시간대, 구분)별 1위 역이 나옵니다.
+        by_name = df_wide.groupby('지하철역', observed=True)[value_cols].sum()
+        top_station_info = pd.DataFrame({
+            '시간대': [c[:2] for c in value_cols],
+            '구분': [c[3:] for c in value_cols],
+            '지하철역': by_name.idxmax(axis=0).to_numpy(),
+            '인원수': by_name.max(axis=0).to_numpy(),
+        })
+
+        # 스택 그래프용 호선별 구성은 1위로 뽑힌 소수의 역만 long 포맷으로 펼쳐 만듭니다.
         top_station_filter = top_station_info[['시간대', '구분', '지하철역']]
-        plot_data_stacked = pd.merge(df_long, top_station_filter, on=['시간대', '구분', '지하철역'])
-        
+        sub = df_wide[df_wide['지하철역'].isin(top_station_filter['지하철역'].unique())]
+        sub_long = sub.melt(id_vars=['사용월', '호선명', '역ID', '지하철역'], var_name='시간구분', value_name='인원수')
+        sub_long['시간대'] = sub_long['시간구분'].str[:2]
+        sub_long['구분'] = sub_long['시간구분'].str[3:]
+        sub_long['지하철역'] = sub_long['지하철역'].astype(str)
+        plot_data_stacked = pd.merge(sub_long, top_station_filter, on=['시간대', '구분', '지하철역'])
+
         top_stations_by_time_combined = top_station_info.copy()
+        top_stations_by_time_combined['시간대'] = top_stations_by_time_combined['시간대'].astype(TIME_SLOT_DTYPE)
         top_stations_by_time_combined['역명(호선)'] = top_stations_by_time_combined['지하철역'] + " (통합)"
 
     else:
-        top_stations_by_time_individual = df_long.loc[df_long.groupby(['시간대', '구분'])['인원수'].idxmax()]
+        # (시간대, 구분)별 최댓값은 컬럼당 벡터화된 argmax 한 번이면 충분합니다.
+        indexed = df_wide.set_index(['호선명', '지하철역'])[value_cols]
+        top_idx = indexed.idxmax()
+        top_stations_by_time_individual = pd.DataFrame({
+            '시간대': pd.array([c[:2] for c in value_cols], dtype=TIME_SLOT_DTYPE),
+            '구분': [c[3:] for c in value_cols],
+            '호선명': [t[0] for t in top_idx],
+            '지하철역': [t[1] for t in top_idx],
+            '인원수': indexed.max().to_numpy(),
+        })
         top_stations_by_time_individual['역명(호선)'] = top_stations_by_time_individual['지하철역'] + "(" + top_stations_by_time_individual['호선명'] + ")"
 
     # 시간 순서를 올바르게 정의
-    time_slots = [f"{h:02d}" for h in range(4, 24)] + ["00", "01"]
+    time_slots = DISPLAY_TIME_SLOTS
 
     col1, col2 = st.columns(2)
     with col1:
@@ -84,18 +68,18 @@ if df_long is not None:
         data_ride = (top_stations_by_time_combined if combine_stations else top_stations_by_time_individual).copy()
         data_ride = data_ride[data_ride['구분'] == '승차']
 
-        # 데이터 자체에 시간 순서를 명확하게 정의
-        data_ride['시간대'] = pd.Categorical(data_ride['시간대'], categories=time_slots, ordered=True)
-        data_ride = data_ride.sort_values('시간대')
+        # 시간대는 로드 시점에 운행 순서가 정의된 categorical — 변환 없이 바로 정렬합니다.
+        data_ride = data_ride[data_ride['시간대'].isin(time_slots)].sort_values('시간대')
 
         if show_line_contribution:
-            plot_data_ride = plot_data_stacked[plot_data_stacked['구분'] == '승차'].copy()
-            plot_data_ride['시간대'] = pd.Categorical(plot_data_ride['시간대'], categories=time_slots, ordered=True)
-            plot_data_ride = plot_data_ride.sort_values('시간대')
-            
+            # 필요한 행·열만 추려 직렬화 크기를 줄이고, 축 순서는 category_orders로 plotly에 알려줍니다.
+            plot_data_ride = plot_data_stacked.loc[plot_data_stacked['구분'] == '승차', ['시간대', '인원수', '호선명', '지하철역']]
+
             fig_ride = px.bar(
                 plot_data_ride, x='시간대', y='인원수', color='호선명', text='지하철역',
-                title='시간대별 최다 승차역 (호선별 구성)'
+                title='시간대별 최다 승차역 (호선별 구성)',
+                category_orders={'시간대': time_slots},
+                color_discrete_map=line_color_map()
             )
             fig_ride.update_traces(textposition='outside')
         else:
@@ -111,18 +95,18 @@ if df_long is not None:
         data_alight = (top_stations_by_time_combined if combine_stations else top_stations_by_time_individual).copy()
         data_alight = data_alight[data_alight['구분'] == '하차']
 
-        # 데이터 자체에 시간 순서를 명확하게 정의
-        data_alight['시간대'] = pd.Categorical(data_alight['시간대'], categories=time_slots, ordered=True)
-        data_alight = data_alight.sort_values('시간대')
+        # 시간대는 로드 시점에 운행 순서가 정의된 categorical — 변환 없이 바로 정렬합니다.
+        data_alight = data_alight[data_alight['시간대'].isin(time_slots)].sort_values('시간대')
 
         if show_line_contribution:
-            plot_data_alight = plot_data_stacked[plot_data_stacked['구분'] == '하차'].copy()
-            plot_data_alight['시간대'] = pd.Categorical(plot_data_alight['시간대'], categories=time_slots, ordered=True)
-            plot_data_alight = plot_data_alight.sort_values('시간대')
+            # 필요한 행·열만 추려 직렬화 크기를 줄이고, 축 순서는 category_orders로 plotly에 알려줍니다.
+            plot_data_alight = plot_data_stacked.loc[plot_data_stacked['구분'] == '하차', ['시간대', '인원수', '호선명', '지하철역']]
 
             fig_alight = px.bar(
                 plot_data_alight, x='시간대', y='인원수', color='호선명', text='지하철역',
-                title='시간대별 최다 하차역 (호선별 구성)'
+                title='시간대별 최다 하차역 (호선별 구성)',
+                category_orders={'시간대': time_slots},
+                color_discrete_map=line_color_map()
             )
             fig_alight.update_traces(textposition='outside')
         else:
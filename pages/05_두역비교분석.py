@@ -2,42 +2,21 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
-# 데이터 로딩 및 전처리 함수
-@st.cache_data
-def load_and_prep_data():
-    """
-    데이터를 로드하고 모든 전처리를 수행하여 분석에 바로 사용할 수 있는
-    깨끗한 '와이드' 포맷의 데이터프레임을 반환합니다.
-    """
-    dtype_spec = {'호선명': str, '지하철역': str}
-    try:
-        df = pd.read_csv('지하철데이터.csv', encoding='cp949', dtype=dtype_spec)
-    except UnicodeDecodeError:
-        df = pd.read_csv('지하철데이터.csv', encoding='utf-8-sig', dtype=dtype_spec)
-    except FileNotFoundError:
-        st.error("😥 '지하철데이터.csv' 파일을 찾을 수 없습니다. 프로젝트 루트 디렉토리에 파일을 업로드해주세요.")
-        return None
-    
-    df.dropna(subset=['호선명', '지하철역'], inplace=True)
-    df = df.iloc[:, :-1].copy() # 불필요한 마지막 열 제거 및 복사본 생성
-    
-    # 컬럼 이름 재정의
-    col_names = ['사용월', '호선명', '역ID', '지하철역']
-    for i in range(4, len(df.columns), 2):
-        time_str = df.columns[i].split('~')[0][:2]
-        col_names.append(f'{time_str}_승차')
-        col_names.append(f'{time_str}_하차')
-    df.columns = col_names
-    
-    # 인원수 데이터 숫자형으로 변환
+# 데이터 로딩 및 전처리 함수 (모든 페이지와 캐시 공유)
+from utils.data import load_data as load_and_prep_data
+from utils.data import station_index, DISPLAY_TIME_SLOTS, RIDE_COLS, ALIGHT_COLS
+
+# 역별 합산 행렬 캐시: 역을 바꿔 선택할 때마다
+# 전체 프레임을 불리언 마스크로 스캔하는 대신 행 하나만 조회합니다.
+@st.cache_data(show_spinner=False)
+def get_station_sums(combine_stations):
+    """(합산 여부별) 역당 한 행짜리 시간대 합산 프레임을 반환합니다."""
+    df = load_and_prep_data()
     value_cols = [c for c in df.columns if '_승차' in c or '_하차' in c]
-    for col in value_cols:
-        if df[col].dtype == 'object':
-            df[col] = pd.to_numeric(df[col].str.replace(',', ''), errors='coerce').fillna(0).astype(int)
-        else:
-            df[col] = df[col].fillna(0).astype(int)
-            
-    return df
+    if combine_stations:
+        return df.groupby('지하철역', observed=True)[value_cols].sum()
+    # (호선, 역) 조합은 행마다 유일하므로 합산 없이 인덱스만 세우면 됩니다.
+    return df.set_index(['호선명', '지하철역'])[value_cols]
 
 # --- 앱 UI 부분 ---
 st.header("🆚 두 역 시간대별 데이터 비교")
@@ -48,10 +27,12 @@ df_clean = load_and_prep_data()
 if df_clean is not None:
     combine_stations = st.checkbox("🔁 동일 역명 데이터 합산", help="체크 시, 모든 호선의 데이터를 합산하여 역별 데이터를 분석합니다.")
 
-    # 역 선택 목록 준비
+    # 역 선택 목록 준비 (모든 페이지와 공유되는 캐시 목록)
+    station_sums = get_station_sums(combine_stations)
+    station_names, line_pairs = station_index()
+    station_list = station_names if combine_stations else line_pairs
+
     if combine_stations:
-        station_list = sorted(df_clean['지하철역'].unique())
-        
         if len(station_list) > 1:
             default_index_1 = 0
             default_index_2 = 1
@@ -62,15 +43,13 @@ if df_clean is not None:
         station1_name = st.selectbox("첫 번째 역을 선택하세요.", station_list, index=default_index_1)
         station2_name = st.selectbox("두 번째 역을 선택하세요.", station_list, index=default_index_2)
 
-        station1_data = df_clean[df_clean['지하철역'] == station1_name].sum(numeric_only=True)
-        station2_data = df_clean[df_clean['지하철역'] == station2_name].sum(numeric_only=True)
+        station1_data = station_sums.loc[station1_name]
+        station2_data = station_sums.loc[station2_name]
         
         station1_display_name = f"{station1_name} (통합)"
         station2_display_name = f"{station2_name} (통합)"
 
     else:
-        station_list = sorted(list(zip(df_clean['호선명'], df_clean['지하철역'])), key=lambda x: (x[1], x[0]))
-        
         default_station_1 = ('2호선', '강남')
         default_station_2 = ('2호선', '홍대입구')
         default_index_1 = station_list.index(default_station_1) if default_station_1 in station_list else 0
@@ -79,26 +58,29 @@ if df_clean is not None:
         station1_tuple = st.selectbox("첫 번째 역을 선택하세요.", station_list, index=default_index_1, format_func=lambda x: f"{x[1]} ({x[0]})")
         station2_tuple = st.selectbox("두 번째 역을 선택하세요.", station_list, index=default_index_2, format_func=lambda x: f"{x[1]} ({x[0]})")
         
-        station1_data = df_clean[(df_clean['호선명'] == station1_tuple[0]) & (df_clean['지하철역'] == station1_tuple[1])].iloc[0]
-        station2_data = df_clean[(df_clean['호선명'] == station2_tuple[0]) & (df_clean['지하철역'] == station2_tuple[1])].iloc[0]
+        station1_data = station_sums.loc[station1_tuple]
+        station2_data = station_sums.loc[station2_tuple]
 
         station1_display_name = f"{station1_tuple[1]} ({station1_tuple[0]})"
         station2_display_name = f"{station2_tuple[1]} ({station2_tuple[0]})"
 
     # 시간 순서를 올바르게 정의
-    time_slots = [f"{h:02d}" for h in range(4, 24)] + ["00", "01"]
-    
-    data_to_plot = []
-    for t in time_slots:
-        s1_ride = station1_data.get(f'{t}_승차', 0)
-        s1_alight = station1_data.get(f'{t}_하차', 0)
-        s2_ride = station2_data.get(f'{t}_승차', 0)
-        s2_alight = station2_data.get(f'{t}_하차', 0)
-        
-        data_to_plot.append([t, s1_ride, s1_alight, station1_display_name])
-        data_to_plot.append([t, s2_ride, s2_alight, station2_display_name])
-
-    plot_df = pd.DataFrame(data_to_plot, columns=['시간대', '승차인원', '하차인원', '역 정보'])
+    time_slots = DISPLAY_TIME_SLOTS
+
+    # 파이썬 루프로 셀을 하나씩 꺼내는 대신, 두 Series를 시간 순서 컬럼으로
+    # 한 번에 잘라 역당 작은 프레임을 만들어 이어 붙입니다.
+    plot_df = pd.concat([
+        pd.DataFrame({
+            '시간대': time_slots,
+            '승차인원': station_data[RIDE_COLS].to_numpy(),
+            '하차인원': station_data[ALIGHT_COLS].to_numpy(),
+            '역 정보': display_name,
+        })
+        for station_data, display_name in (
+            (station1_data, station1_display_name),
+            (station2_data, station2_display_name),
+        )
+    ], ignore_index=True)
 
     st.markdown("---")
 
@@ -1,107 +1,71 @@
+import copy
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 
-# 데이터 로딩 및 기본 전처리 함수
-@st.cache_data
-def load_and_prep_data():
-    """
-    CSV 파일을 로드하고 기본적인 전처리(컬럼명 변경, 타입 변환, long format 변환)를 수행합니다.
-    이 함수는 앱 세션 동안 한 번만 실행됩니다.
-    """
-    dtype_spec = {'호선명': str, '지하철역': str}
-    try:
-        df = pd.read_csv('지하철데이터.csv', encoding='cp949', dtype=dtype_spec)
-    except UnicodeDecodeError:
-        df = pd.read_csv('지하철데이터.csv', encoding='utf-8-sig', dtype=dtype_spec)
-    except FileNotFoundError:
-        st.error("😥 '지하철데이터.csv' 파일을 찾을 수 없습니다. 프로젝트 루트 디렉토리에 파일을 업로드해주세요.")
-        return None
-    
-    df.dropna(subset=['호선명', '지하철역'], inplace=True)
-    df = df.iloc[:, :-1].copy()
-    
-    col_names = ['사용월', '호선명', '역ID', '지하철역']
-    for i in range(4, len(df.columns), 2):
-        time_str = df.columns[i].split('~')[0][:2]
-        col_names.append(f'{time_str}_승차')
-        col_names.append(f'{time_str}_하차')
-    df.columns = col_names
-    
-    value_cols = [c for c in df.columns if '_승차' in c or '_하차' in c]
-    for col in value_cols:
-        if df[col].dtype == 'object':
-            df[col] = pd.to_numeric(df[col].str.replace(',', ''), errors='coerce').fillna(0).astype(int)
-        else:
-            df[col] = df[col].fillna(0).astype(int)
-            
-    id_vars = ['사용월', '호선명', '역ID', '지하철역']
-    df_long = df.melt(id_vars=id_vars, var_name='시간구분', value_name='인원수')
-    df_long['시간대'] = df_long['시간구분'].str.split('_').str[0]
-    df_long['구분'] = df_long['시간구분'].str.split('_').str[1]
-    df_long = df_long.drop(columns=['시간구분'])
-    return df_long
-
-# 모든 무거운 계산을 하나의 캐시 함수로 통합
-@st.cache_data
-def get_animation_data(df_long, combine_stations, analysis_type, top_n):
+# 데이터 로딩 및 기본 전처리 함수 (모든 페이지와 캐시 공유)
+from utils.data import load_data, TIME_SLOT_DTYPE, DISPLAY_TIME_SLOTS, RIDE_COLS, ALIGHT_COLS
+
+# 누적 집계 계층: (합산 여부, 분석 기준)별로 한 번만 계산되는 작은 프레임.
+# top_n 슬라이더를 움직여도 이 프레임은 다시 만들지 않습니다.
+@st.cache_data(show_spinner=False)
+def cumulative_by_station(combine_stations, analysis_type):
     """
-    선택된 옵션에 따라 최종 애니메이션 데이터를 생성합니다.
-    이 함수는 top_n을 포함한 주요 옵션이 변경될 때만 재실행됩니다.
+    와이드 프레임에서 바로 역별 누적 인원 프레임을 만듭니다.
+
+    melt + groupby-cumsum 대신 시간 순서대로 고른 컬럼 행렬에
+    np.cumsum(axis=1) 한 번이면 같은 결과가 나옵니다.
+    반환: [시간대, 역명(호선), 누적인원수] long 프레임 (역 수 × 22행)
     """
-    if analysis_type != '종합':
-        df_filtered = df_long[df_long['구분'] == analysis_type]
-    else:
-        df_filtered = df_long
+    df_wide = load_data()
 
+    value_cols = [c for c in df_wide.columns if '_승차' in c or '_하차' in c]
     if combine_stations:
-        grouped = df_filtered.groupby(['시간대', '지하철역'])['인원수'].sum().reset_index()
-        grouped['역명(호선)'] = grouped['지하철역']
+        agg = df_wide.groupby('지하철역', observed=True)[value_cols].sum()
+        names = agg.index.astype(str)
     else:
-        grouped = df_filtered.groupby(['시간대', '호선명', '지하철역'])['인원수'].sum().reset_index()
-        grouped['역명(호선)'] = grouped['지하철역'] + "(" + grouped['호선명'] + ")"
-
-    time_slots = [f"{h:02d}" for h in range(4, 24)] + ["00", "01"]
-    grouped['시간대'] = pd.Categorical(grouped['시간대'], categories=time_slots, ordered=True)
-    grouped = grouped.sort_values(['역명(호선)', '시간대'])
-
-    grouped['누적인원수'] = grouped.groupby('역명(호선)')['인원수'].cumsum()
-    
-    # --- FINAL FIX: y축을 순위로 사용하는 새로운 데이터 생성 로직 ---
-    # 1. 각 시간대별로 TOP N을 필터링하고 순위 부여
-    final_frames = []
-    for time_slot in time_slots:
-        # 해당 시간대의 데이터 필터링 및 정렬
-        top_n_at_time = grouped[grouped['시간대'] == time_slot].nlargest(top_n, '누적인원수')
-        
-        # 순위 부여 (1위가 가장 위로 가도록)
-        top_n_at_time['순위'] = range(1, len(top_n_at_time) + 1)
-        final_frames.append(top_n_at_time)
-        
-    # 모든 프레임 데이터를 하나로 합침
-    animation_data = pd.concat(final_frames, ignore_index=True)
-    return animation_data
+        agg = df_wide.groupby(['호선명', '지하철역'], observed=True)[value_cols].sum()
+        names = (agg.index.get_level_values('지하철역').astype(str)
+                 + "(" + agg.index.get_level_values('호선명').astype(str) + ")")
 
-# --- 앱 UI 부분 ---
-st.header("🏁 시간대별 누적 유동인구 레이싱 차트")
-st.markdown("시간의 흐름에 따라 각 역의 **누적** 승하차 인원 순위가 어떻게 변하는지 애니메이션으로 확인합니다. 최종 승자는 누가 될까요?")
+    if analysis_type == '승차':
+        mat = agg[RIDE_COLS].to_numpy()
+    elif analysis_type == '하차':
+        mat = agg[ALIGHT_COLS].to_numpy()
+    else:  # '종합'
+        mat = agg[RIDE_COLS].to_numpy() + agg[ALIGHT_COLS].to_numpy()
 
-df_long = load_and_prep_data()
+    cum = pd.DataFrame(np.cumsum(mat, axis=1), columns=DISPLAY_TIME_SLOTS)
+    cum['역명(호선)'] = names
+    cum_long = cum.melt(id_vars='역명(호선)', var_name='시간대', value_name='누적인원수')
+    cum_long['시간대'] = cum_long['시간대'].astype(TIME_SLOT_DTYPE)
+    return cum_long
 
-if df_long is not None:
-    combine_stations = st.checkbox("🔁 동일 역명 데이터 합산", help="체크 시, 환승역 데이터를 합산하여 분석합니다.")
-    analysis_type = st.radio("📈 분석 기준 선택", ('종합', '승차', '하차'), horizontal=True)
-    top_n = st.slider("📊 표시할 순위 (TOP N)", 5, 20, 10)
-    animation_speed = st.slider(
-        "💨 애니메이션 속도 조절 (ms)",
-        min_value=100, max_value=1000, value=300, step=50,
-        help="프레임 전환 속도입니다. 값이 낮을수록 빨라집니다."
-    )
+# 최종 애니메이션 데이터: 캐시된 누적 프레임에서 TOP N만 필터링합니다.
+@st.cache_data(show_spinner=False)
+def get_animation_data(combine_stations, analysis_type, top_n):
+    """
+    선택된 옵션에 따라 최종 애니메이션 데이터를 생성합니다.
+    누적 계산은 위 캐시 계층에서 가져오므로 top_n 변경은 필터링만 다시 합니다.
+    """
+    cum_long = cumulative_by_station(combine_stations, analysis_type)
 
-    animation_data = get_animation_data(df_long, combine_stations, analysis_type, top_n)
+    # 시간대별 파이썬 루프 + nlargest 대신 C 레벨 groupby-rank 한 번으로
+    # TOP N을 거르고 순위를 부여합니다. (1위가 가장 위로 가도록)
+    ranks = cum_long.groupby('시간대', observed=True)['누적인원수'].rank(method='first', ascending=False)
+    animation_data = cum_long.loc[ranks <= top_n].copy()
+    animation_data['순위'] = ranks.loc[animation_data.index].astype(int)
+    animation_data = animation_data.sort_values(['시간대', '순위']).reset_index(drop=True)
+    return animation_data
 
-    st.markdown("---")
-    st.info("▶️ 아래 그래프의 재생 버튼을 눌러 시간대별 **누적** 순위 변화를 확인하세요!")
+# 레이싱 차트 figure 캐시: 속도 슬라이더와 무관한 옵션 조합으로만 키를 만듭니다.
+# go.Figure는 값 해싱 대상이 아니므로 cache_data 대신 cache_resource를 사용합니다.
+@st.cache_resource(show_spinner=False)
+def make_race_fig(combine_stations, analysis_type, top_n):
+    """선택된 옵션 조합의 레이싱 차트 figure를 생성합니다."""
+    animation_data = get_animation_data(combine_stations, analysis_type, top_n)
 
     # --- FINAL FIX: y축을 '순위'로, 텍스트를 '역명(호선)'으로 변경 ---
     fig = px.bar(
@@ -112,14 +76,15 @@ if df_long is not None:
         color="역명(호선)",
         animation_frame="시간대",
         text="역명(호선)", # 막대 위에 역 이름을 표시
-        title=f"시간대별 누적 {analysis_type} 인원 TOP {top_n} 레이싱 차트"
+        title=f"시간대별 누적 {analysis_type} 인원 TOP {top_n} 레이싱 차트",
+        category_orders={'시간대': DISPLAY_TIME_SLOTS}
     )
 
     chart_height = top_n * 45 + 150
 
     # y축을 뒤집어서 1위가 위로 오게 하고, 라벨은 보이지 않게 처리
     fig.update_yaxes(autorange="reversed", showticklabels=False, title="순위")
-    
+
     fig.update_layout(
         xaxis_title="누적 인원수",
         yaxis_title="순위", # y축 제목은 '순위'
@@ -127,21 +92,51 @@ if df_long is not None:
         height=chart_height,
         margin=dict(l=0, r=0, t=100, b=20)
     )
-    
-    fig.layout.updatemenus[0].buttons[0].args[1]['frame']['duration'] = animation_speed
-    fig.layout.updatemenus[0].buttons[0].args[1]['transition']['duration'] = int(animation_speed * 0.3)
-    
+
     if not animation_data.empty:
         max_value = animation_data['누적인원수'].max()
         fig.update_xaxes(range=[0, max_value * 1.3])
-    
+
     # 막대 위 텍스트(역 이름)와 막대 끝 숫자 텍스트를 모두 설정
+    # 역명과 인원수가 이미 막대 텍스트로 표시되므로, 애니메이션 프레임마다
+    # 수행되는 호버 이벤트 처리는 건너뛰어 클라이언트 부하를 줄입니다.
     fig.update_traces(
-        texttemplate='%{text} (%{x:,.0f})', 
+        texttemplate='%{text} (%{x:,.0f})',
         textposition='outside',
         textfont_size=12,
-        insidetextanchor='end'
+        insidetextanchor='end',
+        hoverinfo='skip',
+        hovertemplate=None
     )
+    return fig
+
+# --- 앱 UI 부분 ---
+st.header("🏁 시간대별 누적 유동인구 레이싱 차트")
+st.markdown("시간의 흐름에 따라 각 역의 **누적** 승하차 인원 순위가 어떻게 변하는지 애니메이션으로 확인합니다. 최종 승자는 누가 될까요?")
+
+df_wide = load_data()
+
+if df_wide is not None:
+    combine_stations = st.checkbox("🔁 동일 역명 데이터 합산", help="체크 시, 환승역 데이터를 합산하여 분석합니다.")
+    analysis_type = st.radio("📈 분석 기준 선택", ('종합', '승차', '하차'), horizontal=True)
+    top_n = st.slider("📊 표시할 순위 (TOP N)", 5, 20, 10)
+    animation_speed = st.slider(
+        "💨 애니메이션 속도 조절 (ms)",
+        min_value=100, max_value=1000, value=300, step=50,
+        help="프레임 전환 속도입니다. 값이 낮을수록 빨라집니다."
+    )
+
+    st.markdown("---")
+    st.info("▶️ 아래 그래프의 재생 버튼을 눌러 시간대별 **누적** 순위 변화를 확인하세요!")
+
+    # cache_resource가 돌려주는 figure는 세션 간에 공유되는 객체이므로
+    # 직접 수정하지 않고 복사본에 속도 스칼라 두 개만 덮어씁니다 —
+    # (go.Figure(fig)는 애니메이션 frames를 버리므로 deepcopy를 사용합니다)
+    # 슬라이더를 움직여도 집계·figure 생성은 다시 실행되지 않습니다.
+    fig = copy.deepcopy(make_race_fig(combine_stations, analysis_type, top_n))
+    fig.layout.updatemenus[0].buttons[0].args[1]['frame']['duration'] = animation_speed
+    fig.layout.updatemenus[0].buttons[0].args[1]['transition']['duration'] = int(animation_speed * 0.3)
 
-    st.plotly_chart(fig, use_container_width=True)
+    # 애니메이션에 불필요한 스크롤 줌 핸들러를 꺼서 클라이언트 부하를 줄입니다.
+    st.plotly_chart(fig, use_container_width=True, config={'scrollZoom': False, 'responsive': True})
 
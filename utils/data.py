@@ -0,0 +1,293 @@
+import io
+import os
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+
+# 공용 데이터 로딩 모듈
+# 모든 페이지가 이 모듈의 함수를 공유하므로 Streamlit 캐시 항목도 하나만 생성되고,
+# 페이지를 이동해도 CSV를 다시 파싱하지 않습니다.
+
+CSV_PATH = '지하철데이터.csv'
+PARQUET_PATH = '지하철데이터.parquet'
+
+# 시간대 표시 순서: 첫차(04시)부터 자정을 넘어 새벽(03시)까지
+TIME_SLOT_ORDER = [f'{h:02d}' for h in range(4, 24)] + ['00', '01', '02', '03']
+# 순서가 정의된 categorical dtype — 다운스트림 sort_values가 문자열 비교 없이
+# 정수 코드로 정렬되고, 페이지마다 pd.Categorical을 다시 만들 필요가 없습니다.
+TIME_SLOT_DTYPE = pd.CategoricalDtype(TIME_SLOT_ORDER, ordered=True)
+
+# 페이지 공통 표시 시간대 (첫차 04시 ~ 익일 01시, 02·03시는 표시하지 않음)
+DISPLAY_TIME_SLOTS = TIME_SLOT_ORDER[:-2]
+# 표시 순서대로 미리 조립해 둔 승차/하차 컬럼명 — 핫 패스에서 매번 재조립하지 않습니다.
+RIDE_COLS = [f'{t}_승차' for t in DISPLAY_TIME_SLOTS]
+ALIGHT_COLS = [f'{t}_하차' for t in DISPLAY_TIME_SLOTS]
+
+_MISSING_FILE_MSG = "😥 '지하철데이터.csv' 파일을 찾을 수 없습니다. 프로젝트 루트 디렉토리에 파일을 업로드해주세요."
+
+
+def _detect_encoding(sample):
+    """
+    바이트 샘플을 cp949로 먼저 디코딩해 보고 실패하면 utf-8-sig로 판정합니다.
+
+    샘플이 파일 중간에서 잘린 경우 2바이트 cp949 문자가 경계에 걸쳐
+    끊길 수 있으므로, 샘플 끝에서 난 디코딩 오류는 실패로 치지 않습니다.
+    """
+    try:
+        sample.decode('cp949')
+        return 'cp949'
+    except UnicodeDecodeError as e:
+        if e.start >= len(sample) - 2:
+            return 'cp949'
+        return 'utf-8-sig'
+
+
+def _read_raw_csv_pandas(path):
+    """
+    pandas C 엔진으로 CSV를 읽는 예비 경로입니다.
+
+    인코딩 실패 시 파일 전체를 두 번 읽는 try/except 재시도 대신,
+    바이트를 한 번만 읽고 앞부분 샘플로 인코딩을 판별한 뒤
+    메모리 버퍼에서 바로 파싱합니다.
+
+    둘째 줄(승차/하차 서브헤더)을 건너뛰고 thousands=','를 넘기면
+    쉼표 제거와 정수 변환이 C 토크나이저 안에서 한 번에 끝나므로,
+    이후 문자열 후처리 패스가 필요 없습니다.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    enc = _detect_encoding(raw[:65536])
+    dtype_spec = {'호선명': str, '지하철역': str}
+    return pd.read_csv(io.BytesIO(raw), encoding=enc, dtype=dtype_spec, thousands=',', skiprows=[1])
+
+
+@st.cache_data(persist="disk", show_spinner=False)
+def _read_raw_csv(path, mtime):
+    """
+    CSV 파싱 결과만 별도의 캐시 계층으로 분리합니다.
+
+    가능하면 pyarrow의 멀티스레드 C++ CSV 파서를 사용하고,
+    pyarrow가 없거나 파싱에 실패하면 pandas C 엔진으로 돌아갑니다.
+    mtime이 캐시 키에 포함되므로 파일이 바뀌면 다시 읽고,
+    아래 변환 코드가 수정되어도 가장 비싼 파싱 단계의 캐시는 유지됩니다.
+    """
+    try:
+        from pyarrow import csv as pacsv
+    except ImportError:
+        return _read_raw_csv_pandas(path)
+
+    # 헤더 행만 직접 읽어 컬럼 이름을 만들고, 본문은 C++ 파서가 병렬로 읽습니다.
+    # (이 파일은 헤더가 2줄이라 — 시간대 행 + 승차/하차 행 — 이름을 직접 만들어야 합니다)
+    with open(path, 'rb') as f:
+        header_line = f.readline()
+    enc = _detect_encoding(header_line)
+    header = header_line.decode(enc)
+    names = header.lstrip('﻿').rstrip('\r\n').split(',')
+    names = [n if n else f'Unnamed: {i}' for i, n in enumerate(names)]
+
+    try:
+        table = pacsv.read_csv(
+            path,
+            read_options=pacsv.ReadOptions(
+                column_names=names, skip_rows=2, encoding=enc, block_size=2 << 20
+            ),
+        )
+    except Exception:
+        return _read_raw_csv_pandas(path)
+
+    df = table.to_pandas()
+    for col in ('호선명', '지하철역'):
+        df[col] = df[col].astype(str)
+    return df
+
+
+def _transform(df):
+    """파싱된 원본 데이터프레임에 공통 전처리(컬럼명 변경, 숫자 변환)를 적용합니다."""
+    df.dropna(subset=['호선명', '지하철역'], inplace=True)
+    df = df.iloc[:, :-1].copy()  # 불필요한 마지막 열 제거 및 복사본 생성
+
+    # 컬럼 이름 재정의 (파이썬 루프 대신 컬럼 Index에 대한 벡터 문자열 연산으로 일괄 생성)
+    time_strs = df.columns[4::2].str.split('~').str[0].str[:2]
+    col_names = ['사용월', '호선명', '역ID', '지하철역'] + [
+        f'{t}_{kind}' for t in time_strs for kind in ('승차', '하차')
+    ]
+    df.columns = col_names
+
+    # 인원수 데이터 숫자형으로 변환
+    # 컬럼별 파이썬 루프 대신 문자열 컬럼 전체를 한 번에 쌓아 단일 C 패스로 변환합니다.
+    value_cols = [c for c in df.columns if '_승차' in c or '_하차' in c]
+    obj_cols = [c for c in value_cols if df[c].dtype == 'object']
+    if obj_cols:
+        block = df[obj_cols].stack().str.replace(',', '', regex=False)
+        df[obj_cols] = pd.to_numeric(block, errors='coerce').unstack().reindex(columns=obj_cols)
+    # int32면 승하차 인원수 범위를 충분히 담고, int64 대비 메모리 대역폭이 절반입니다.
+    df[value_cols] = df[value_cols].fillna(0).astype('int32')
+
+    # 저카디널리티 문자열은 category로 저장 — 메모리를 줄이고
+    # groupby가 문자열 해싱 대신 정수 코드 경로를 타게 됩니다.
+    df['호선명'] = df['호선명'].astype('category')
+    df['지하철역'] = df['지하철역'].astype('category')
+    return df
+
+
+# 로드 결과는 st.cache_resource로 캐시합니다. st.cache_data는 캐시 적중마다
+# 결과 전체를 pickle 복사해서 돌려주지만, 이 프레임들은 로드 후 수정되지 않으므로
+# 같은 객체를 그대로 재사용하는 편이 페이지 인터랙션마다 훨씬 쌉니다.
+# ⚠️ 호출자는 반환된 프레임/배열을 직접 수정하면 안 됩니다. (필요하면 .copy())
+
+
+@st.cache_resource(show_spinner="🚇 지하철 데이터를 불러오는 중...")
+def _load_wide():
+    """전처리 완료된 와이드 프레임. 파일이 없으면 FileNotFoundError를 던집니다."""
+    try:
+        csv_mtime = os.path.getmtime(CSV_PATH)
+    except FileNotFoundError:
+        csv_mtime = None
+
+    # 전처리까지 끝난 Parquet 사이드카가 있고 CSV보다 최신이면 파싱을 통째로
+    # 건너뜁니다. (컬럼형·타입 보존 바이너리라 cp949 CSV 재파싱보다 훨씬 빠릅니다)
+    # CSV가 교체되면 mtime 비교로 사이드카가 무효화되어 다시 만들어집니다.
+    if os.path.exists(PARQUET_PATH) and (csv_mtime is None or os.path.getmtime(PARQUET_PATH) >= csv_mtime):
+        return pd.read_parquet(PARQUET_PATH)
+
+    if csv_mtime is None:
+        raise FileNotFoundError(CSV_PATH)
+
+    raw = _read_raw_csv(CSV_PATH, csv_mtime)
+    df = _transform(raw)
+    try:
+        df.to_parquet(PARQUET_PATH, compression='zstd')
+    except (ImportError, OSError):
+        pass  # pyarrow가 없거나 쓰기 불가능한 환경이면 사이드카 없이 동작
+    return df
+
+
+def load_data():
+    """
+    CSV 파일을 읽고 공통 전처리를 수행하여
+    분석에 바로 사용할 수 있는 '와이드' 포맷 데이터프레임을 반환합니다.
+
+    반환된 프레임은 캐시된 원본 객체이므로 수정하지 말고 읽기 전용으로 쓰세요.
+    """
+    try:
+        return _load_wide()
+    except FileNotFoundError:
+        st.error(_MISSING_FILE_MSG)
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def _load_station_hourly_agg(combine_stations):
+    if combine_stations:
+        # 전체 프레임을 다시 스캔하지 않고, 이미 캐시된 호선별 집계(역당 한 행)를
+        # 역 이름 기준으로 한 번 더 합칩니다. 입력이 수백 행뿐이라 사실상 공짜입니다.
+        per_labels, hours, per_arr = _load_station_hourly_agg(False)
+        flat = pd.DataFrame(per_arr.reshape(len(per_labels), -1))
+        flat.index = pd.Index(per_labels['지하철역'])
+        agg = flat.groupby(level=0, observed=True).sum()
+        arr = agg.to_numpy().reshape(len(agg), len(hours), 2)
+        labels = agg.index.to_frame(index=False)
+        labels['역명(호선)'] = labels['지하철역'].astype(str) + " (통합)"
+        return labels, hours, arr
+
+    df = _load_wide()
+    value_cols = [c for c in df.columns if '_승차' in c or '_하차' in c]
+    ride_cols = [c for c in value_cols if c.endswith('_승차')]
+    # 시간대 축은 int8 (0~23) — 마스크 생성이 문자열 비교가 아닌 정수 비교로 끝납니다.
+    hours = np.array([int(c[:2]) for c in ride_cols], dtype=np.int8)
+
+    agg = df.groupby(['호선명', '지하철역'], observed=True)[value_cols].sum()
+    arr = agg.to_numpy().reshape(len(agg), len(hours), 2)
+    labels = agg.index.to_frame(index=False)
+    # 표시용 라벨도 로드 시 한 번만 만들어 둡니다 (쿼리마다 문자열 연결 없음)
+    labels['역명(호선)'] = labels['지하철역'].astype(str) + "(" + labels['호선명'].astype(str) + ")"
+    return labels, hours, arr
+
+
+def load_station_hourly_agg(combine_stations=False):
+    """
+    사용월 차원을 미리 합산한 역별 시간대 집계 배열을 반환합니다.
+
+    페이지에서는 시간대별 합산이 항상 사용월을 통째로 더하므로,
+    역당 한 행짜리 작은 배열을 로드 시점에 만들어 두면
+    슬라이더 조작은 마스크 슬라이싱 + 합산 몇 마이크로초로 끝납니다.
+
+    반환값: (labels, hours, arr)
+      - labels: 집계 키(지하철역 또는 호선명/지하철역) 데이터프레임
+      - hours: 시간대 int8 배열 (4, 5, ..., 23, 0, ...)
+      - arr: (len(labels), len(hours), 2) 배열. 마지막 축은 (승차, 하차)
+    """
+    try:
+        return _load_station_hourly_agg(combine_stations)
+    except FileNotFoundError:
+        st.error(_MISSING_FILE_MSG)
+        return None, None, None
+
+
+def top_n_by(df, column, n):
+    """
+    column 값 기준 상위 n개 행을 내림차순으로 반환합니다.
+
+    nlargest의 전체 O(N log N) 정렬 대신 np.argpartition으로 상위 n개만
+    골라낸 뒤(O(N)) 그 n개만 정렬합니다.
+    """
+    values = df[column].to_numpy()
+    if n >= len(values):
+        idx = np.arange(len(values))
+    else:
+        idx = np.argpartition(-values, n - 1)[:n]
+    idx = idx[np.argsort(-values[idx], kind='stable')]
+    return df.iloc[idx]
+
+
+@st.cache_resource(show_spinner=False)
+def _station_index():
+    df = _load_wide()
+    names = pd.Index(df['지하철역'].unique()).sort_values().tolist()
+    pairs = pd.MultiIndex.from_arrays([df['호선명'], df['지하철역']])
+    line_pairs = pairs.sortlevel(['지하철역', '호선명'])[0].tolist()
+    return names, line_pairs
+
+
+def station_index():
+    """
+    선택 위젯용 역 목록을 정렬된 상태로 반환합니다.
+
+    반환값: (names, line_pairs)
+      - names: 역 이름 목록 (가나다순)
+      - line_pairs: (호선명, 지하철역) 튜플 목록 (역 이름 → 호선 순 정렬)
+
+    답이 데이터에 대해 고정이므로 한 번만 계산되고, 페이지들은
+    리런마다 파이썬 정렬을 다시 하지 않고 같은 목록을 재사용합니다.
+    """
+    try:
+        return _station_index()
+    except FileNotFoundError:
+        st.error(_MISSING_FILE_MSG)
+        return None, None
+
+
+@st.cache_resource(show_spinner=False)
+def _line_color_map():
+    # plotly는 차트를 그리는 페이지에서만 필요하므로 모듈 전체가 아닌 여기서 임포트합니다.
+    import plotly.express as px
+
+    df = _load_wide()
+    lines = sorted(df['호선명'].cat.categories.tolist())
+    palette = px.colors.qualitative.Alphabet
+    return {line: palette[i % len(palette)] for i, line in enumerate(lines)}
+
+
+def line_color_map():
+    """
+    호선명 → 색상 고정 매핑을 반환합니다.
+
+    px.bar의 color_discrete_map으로 넘기면 plotly가 호출마다 고유 카테고리를
+    다시 찾아 색을 배정하는 과정을 건너뛰고, 차트 간·프레임 간 색상도 일정해집니다.
+    """
+    try:
+        return _line_color_map()
+    except FileNotFoundError:
+        st.error(_MISSING_FILE_MSG)
+        return None